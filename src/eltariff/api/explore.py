@@ -1,7 +1,8 @@
 """API endpoints for exploring existing RISE APIs."""
 
-import os
-from datetime import datetime, timezone
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
 from typing import Any
 from urllib.parse import urlparse
 
@@ -9,15 +10,25 @@ from fastapi import APIRouter
 from pydantic import BaseModel, HttpUrl
 
 from ..models.input import TariffExplanation
-from ..models.rise_schema import TariffsResponse
-from ..services.ai_parser import TariffParser
-from ..services.url_scraper import URLScraper
+from ..models.rise_schema import Tariff, TariffsResponse
+from ..services.ai_parser import OPENROUTER_API_KEY, get_parser
+from ..services.url_scraper import get_scraper
 
 router = APIRouter(prefix="/api/explore", tags=["explore"])
 
 CATALOGUE_URL = "https://eltariff.deplide.org/tariffcatalogue/all"
-_catalogue_cache: list["CatalogueApi"] = []
-_catalogue_cache_updated_at: datetime | None = None
+CATALOGUE_CACHE_TTL = timedelta(minutes=5)
+# Cached catalogue and its fetch time, always replaced together as one snapshot
+_catalogue_snapshot: tuple[tuple["CatalogueApi", ...], datetime | None] = ((), None)
+# After a failed fetch, serve the degraded response for a while instead of refetching
+CATALOGUE_RETRY_AFTER = timedelta(seconds=30)
+_catalogue_failure: tuple["CatalogueResponse | None", datetime | None] = (None, None)
+_catalogue_lock = asyncio.Lock()
+
+# Max concurrent AI calls when explaining tariffs
+EXPLAIN_CONCURRENCY = 8
+
+_NON_DIGITS_RE = re.compile(r"\D+")
 
 
 class ExploreRequest(BaseModel):
@@ -39,11 +50,11 @@ class CatalogueApi(BaseModel):
     """Normalized catalogue entry for a RISE-compatible API."""
 
     name: str
-    api_url: HttpUrl
+    api_url: str
     description: str | None = None
     region: str | None = None
     tariff_count: int | None = None
-    source_url: HttpUrl | None = None
+    source_url: str | None = None
     company_org_no: str | None = None
     metering_point_id_from: str | None = None
     metering_point_id_to: str | None = None
@@ -69,11 +80,72 @@ def _extract_catalogue_items(data: Any) -> list[dict[str, Any]]:
     return []
 
 
-def _pick_first(item: dict[str, Any], keys: list[str]) -> Any:
-    for key in keys:
-        if key in item and item[key] not in (None, ""):
-            return item[key]
-    return None
+# Accepted source keys per catalogue field, in priority order
+CATALOGUE_FIELD_KEYS: dict[str, tuple[str, ...]] = {
+    "api_url": (
+        "api_url",
+        "apiUrl",
+        "base_url",
+        "baseUrl",
+        "url",
+        "endpoint",
+        "rise_api",
+        "riseApi",
+        "tariff_api_url",
+    ),
+    "name": (
+        "name",
+        "title",
+        "company",
+        "companyName",
+        "company_name",
+        "utility",
+        "network_company",
+        "networkCompany",
+        "grid_owner",
+        "operator",
+    ),
+    "description": ("description", "summary", "notes"),
+    "region": ("region", "area", "city", "municipality", "county"),
+    "tariff_count": ("tariff_count", "tariffCount", "count"),
+    "source_url": (
+        "source_url",
+        "sourceUrl",
+        "homepage",
+        "website",
+        "userDocUrlOrEmail",
+    ),
+    "company_org_no": ("company_org_no", "companyOrgNo", "orgNo"),
+    "metering_point_id_from": ("meteringPointIdFrom", "metering_point_id_from"),
+    "metering_point_id_to": ("meteringPointIdTo", "metering_point_id_to"),
+}
+
+# Reverse lookup: source key -> (field, priority)
+_CATALOGUE_KEY_LOOKUP: dict[str, tuple[str, int]] = {
+    key: (field, rank)
+    for field, keys in CATALOGUE_FIELD_KEYS.items()
+    for rank, key in enumerate(keys)
+}
+
+
+def _pick_fields(item: dict[str, Any]) -> dict[str, Any]:
+    """Map known source keys to catalogue fields in a single pass over the item."""
+    picked: dict[str, tuple[int, Any]] = {}
+    for key, value in item.items():
+        target = _CATALOGUE_KEY_LOOKUP.get(key)
+        if target is None or value is None or value == "":
+            continue
+        field, rank = target
+        current = picked.get(field)
+        if current is None or rank < current[0]:
+            picked[field] = (rank, value)
+    return {field: value for field, (_, value) in picked.items()}
+
+
+def _is_http_url(value: str) -> bool:
+    """Cheap check that a catalogue value is an absolute http(s) URL."""
+    parsed = urlparse(value)
+    return parsed.scheme in ("http", "https") and bool(parsed.netloc)
 
 
 def _coerce_int(value: Any) -> int | None:
@@ -84,7 +156,9 @@ def _coerce_int(value: Any) -> int | None:
     if isinstance(value, float):
         return int(value)
     if isinstance(value, str):
-        digits = "".join(char for char in value if char.isdigit())
+        if value.isdecimal():
+            return int(value)
+        digits = _NON_DIGITS_RE.sub("", value)
         return int(digits) if digits else None
     return None
 
@@ -93,38 +167,12 @@ def _normalize_catalogue(data: Any) -> list[CatalogueApi]:
     items = _extract_catalogue_items(data)
     apis: list[CatalogueApi] = []
     for item in items:
-        api_url = _pick_first(
-            item,
-            [
-                "api_url",
-                "apiUrl",
-                "base_url",
-                "baseUrl",
-                "url",
-                "endpoint",
-                "rise_api",
-                "riseApi",
-                "tariff_api_url",
-            ],
-        )
-        if not api_url:
+        fields = _pick_fields(item)
+        api_url = fields.get("api_url")
+        if not api_url or not _is_http_url(str(api_url)):
             continue
 
-        name = _pick_first(
-            item,
-            [
-                "name",
-                "title",
-                "company",
-                "companyName",
-                "company_name",
-                "utility",
-                "network_company",
-                "networkCompany",
-                "grid_owner",
-                "operator",
-            ],
-        )
+        name = fields.get("name")
         if not name:
             try:
                 hostname = urlparse(str(api_url)).hostname or str(api_url)
@@ -132,28 +180,20 @@ def _normalize_catalogue(data: Any) -> list[CatalogueApi]:
                 hostname = str(api_url)
             name = hostname.replace("www.", "")
 
-        description = _pick_first(item, ["description", "summary", "notes"])
-        region = _pick_first(item, ["region", "area", "city", "municipality", "county"])
+        description = fields.get("description")
+        region = fields.get("region")
 
-        tariff_count = _pick_first(item, ["tariff_count", "tariffCount", "count"])
+        tariff_count = fields.get("tariff_count")
         if tariff_count is None and isinstance(item.get("tariffs"), list):
             tariff_count = len(item["tariffs"])
         tariff_count = _coerce_int(tariff_count)
 
-        source_url = _pick_first(
-            item,
-            [
-                "source_url",
-                "sourceUrl",
-                "homepage",
-                "website",
-                "userDocUrlOrEmail",
-            ],
-        )
-
-        company_org_no = _pick_first(item, ["company_org_no", "companyOrgNo", "orgNo"])
-        mp_from = _pick_first(item, ["meteringPointIdFrom", "metering_point_id_from"])
-        mp_to = _pick_first(item, ["meteringPointIdTo", "metering_point_id_to"])
+        source_url = fields.get("source_url")
+        if source_url and not _is_http_url(str(source_url)):
+            source_url = None
+        company_org_no = fields.get("company_org_no")
+        mp_from = fields.get("metering_point_id_from")
+        mp_to = fields.get("metering_point_id_to")
 
         try:
             apis.append(
@@ -204,41 +244,69 @@ async def get_known_apis() -> dict[str, Any]:
     return {"apis": [], "error": response.error}
 
 
+def _cached_catalogue() -> CatalogueResponse | None:
+    """Return the cached catalogue if it is still within the TTL."""
+    now = datetime.now(timezone.utc)
+    apis, updated_at = _catalogue_snapshot
+    if apis and updated_at is not None and now - updated_at < CATALOGUE_CACHE_TTL:
+        return CatalogueResponse(success=True, apis=apis)
+    failed, failed_at = _catalogue_failure
+    if failed is not None and failed_at is not None and now - failed_at < CATALOGUE_RETRY_AFTER:
+        return failed
+    return None
+
+
 @router.get("/catalogue")
 async def get_catalogue() -> CatalogueResponse:
     """Fetch the tariff catalogue used by the Explorer UI."""
-    global _catalogue_cache_updated_at
+    cached = _cached_catalogue()
+    if cached:
+        return cached
+
+    # Only one request refetches; concurrent callers wait and reuse its result
+    async with _catalogue_lock:
+        cached = _cached_catalogue()
+        if cached:
+            return cached
+        return await _fetch_catalogue()
+
+
+async def _fetch_catalogue() -> CatalogueResponse:
+    """Fetch the catalogue from upstream, falling back to cached or static data."""
+    global _catalogue_snapshot, _catalogue_failure
     try:
-        scraper = URLScraper()
+        scraper = get_scraper()
         data = await scraper.fetch_json(CATALOGUE_URL)
         apis = _normalize_catalogue(data)
         if apis:
-            _catalogue_cache.clear()
-            _catalogue_cache.extend(apis)
-            _catalogue_cache_updated_at = datetime.now(timezone.utc)
+            _catalogue_snapshot = (tuple(apis), datetime.now(timezone.utc))
+        _catalogue_failure = (None, None)
         return CatalogueResponse(success=True, apis=apis)
     except Exception as e:
-        if _catalogue_cache:
-            return CatalogueResponse(
+        cached_apis, _ = _catalogue_snapshot
+        if cached_apis:
+            response = CatalogueResponse(
                 success=True,
-                apis=_catalogue_cache,
+                apis=cached_apis,
                 warning="Katalogen kunde inte nås. Visar senast hämtade data.",
                 error=str(e),
             )
-        fallback = _fallback_catalogue()
-        return CatalogueResponse(
-            success=True,
-            apis=fallback,
-            warning="Katalogen kunde inte nås. Visar statisk fallback-lista.",
-            error=str(e),
-        )
+        else:
+            response = CatalogueResponse(
+                success=True,
+                apis=_fallback_catalogue(),
+                warning="Katalogen kunde inte nås. Visar statisk fallback-lista.",
+                error=str(e),
+            )
+        _catalogue_failure = (response, datetime.now(timezone.utc))
+        return response
 
 
 @router.post("/fetch")
 async def fetch_api(request: ExploreRequest) -> ExploreResponse:
     """Fetch and parse tariffs from a RISE-compatible API."""
     try:
-        scraper = URLScraper()
+        scraper = get_scraper()
         data = await scraper.fetch_rise_api(str(request.api_url))
 
         # Return raw data without validation for now
@@ -252,25 +320,37 @@ async def explain_tariffs(request: ExploreRequest) -> ExploreResponse:
     """Fetch tariffs and generate human-readable explanations."""
     try:
         # First fetch the tariffs
-        scraper = URLScraper()
-        data = await scraper.fetch_rise_api(str(request.api_url))
-        tariffs_response = TariffsResponse.model_validate(data)
+        scraper = get_scraper()
+        raw = await scraper.fetch_rise_api_bytes(str(request.api_url))
+        tariffs_response = TariffsResponse.model_validate_json(raw)
 
         # Generate explanations for each tariff
-        api_key = os.environ.get("ANTHROPIC_API_KEY")
-        if not api_key:
+        if not OPENROUTER_API_KEY:
             return ExploreResponse(
                 success=True,
                 tariffs=tariffs_response,
                 explanations=[],
             )
 
-        parser = TariffParser(api_key)
-        explanations = []
-
-        for tariff in tariffs_response.tariffs:
-            explanation_data = await parser.explain_tariff(tariff)
-            explanations.append(TariffExplanation.model_validate(explanation_data))
+        parser = get_parser(OPENROUTER_API_KEY)
+        semaphore = asyncio.Semaphore(EXPLAIN_CONCURRENCY)
+
+        async def explain(tariff: Tariff) -> TariffExplanation:
+            async with semaphore:
+                try:
+                    return await parser.explain_tariff(tariff)
+                except Exception:
+                    # Keep one entry per tariff; the UI pairs explanations by index
+                    return TariffExplanation(
+                        tariffName=tariff.name,
+                        summary="Förklaringen kunde inte genereras för denna tariff.",
+                        fixedCosts="",
+                        energyCosts="",
+                    )
+
+        explanations = await asyncio.gather(
+            *(explain(tariff) for tariff in tariffs_response.tariffs)
+        )
 
         return ExploreResponse(
             success=True,
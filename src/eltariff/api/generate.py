@@ -1,21 +1,48 @@
 """API endpoints for generating deployable API code."""
 
+import asyncio
+import hashlib
 import io
-import json
+import tempfile
 import zipfile
+from collections import OrderedDict
+from collections.abc import Iterator
 from typing import Any
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from pydantic import BaseModel
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, NamedStyle, Side
+from openpyxl.utils import get_column_letter
+from pydantic import BaseModel, ValidationError
 
-from ..models.rise_schema import TariffsResponse
-from ..services.api_generator import APIGenerator
+from ..models.rise_schema import PriceComponent, TariffsResponse
+from ..services.api_generator import APIGenerator, make_safe_name
 
 router = APIRouter(prefix="/api/generate", tags=["generate"])
 
+# Shared generator; its Jinja environment caches compiled templates between requests
+_generator = APIGenerator()
+
+# ZIP archives are spooled in memory up to this size before spilling to disk
+ZIP_SPOOL_SIZE = 1024 * 1024
+ZIP_CHUNK_SIZE = 64 * 1024
+# Fastest deflate level: roughly half the CPU of the default for a slightly larger archive
+ZIP_COMPRESSLEVEL = 1
+
+# Generated deployment packages, keyed by company and a hash of the tariff JSON
+PACKAGE_CACHE_SIZE = 64
+_package_cache: OrderedDict[tuple[str, str, bytes], dict[str, str]] = OrderedDict()
+
+# Excel header style parts (immutable, shared between workbooks). The NamedStyle itself
+# is bound to a single workbook when registered, so one is created per workbook.
+HEADER_STYLE_NAME = "tariff_header"
+_HEADER_FONT = Font(bold=True, color="FFFFFFFF")
+_HEADER_FILL = PatternFill(fill_type="solid", fgColor="FF017E7A", bgColor="FF017E7A")
+_THIN_SIDE = Side(style="thin")
+_HEADER_BORDER = Border(left=_THIN_SIDE, right=_THIN_SIDE, top=_THIN_SIDE, bottom=_THIN_SIDE)
+
 
 class GenerateRequest(BaseModel):
     """Request to generate deployment package."""
@@ -25,46 +52,64 @@ class GenerateRequest(BaseModel):
     company_org_no: str
 
 
-@router.post("/package")
-async def generate_package(request: GenerateRequest) -> Response:
-    """Generate a complete deployment package as a ZIP file."""
-    try:
-        # Parse tariffs from JSON
-        tariffs_data = json.loads(request.tariffs_json)
-        tariffs = TariffsResponse.model_validate(tariffs_data)
+def _get_deployment_package(request: GenerateRequest) -> dict[str, str]:
+    """Generate the deployment package files, reusing a cached result for identical input.
 
-        # Generate package
-        generator = APIGenerator()
-        files = generator.generate_deployment_package(
-            tariffs, request.company_name, request.company_org_no
-        )
+    Raises:
+        ValidationError: If the tariff JSON is invalid
+    """
+    digest = hashlib.blake2b(request.tariffs_json.encode(), digest_size=16).digest()
+    key = (request.company_name, request.company_org_no, digest)
+
+    files = _package_cache.get(key)
+    if files is not None:
+        _package_cache.move_to_end(key)
+        return files
+
+    tariffs = TariffsResponse.model_validate_json(request.tariffs_json)
+    files = _generator.generate_deployment_package(
+        tariffs, request.company_name, request.company_org_no
+    )
 
-        # Create ZIP file
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+    _package_cache[key] = files
+    if len(_package_cache) > PACKAGE_CACHE_SIZE:
+        _package_cache.popitem(last=False)
+    return files
+
+
+def _zip_chunks(files: dict[str, str]) -> Iterator[bytes]:
+    """Build a ZIP archive of the files and yield it in chunks."""
+    with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_SIZE) as buffer:
+        with zipfile.ZipFile(
+            buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL
+        ) as zip_file:
             for filename, content in files.items():
                 zip_file.writestr(filename, content)
 
-        zip_buffer.seek(0)
+        buffer.seek(0)
+        while chunk := buffer.read(ZIP_CHUNK_SIZE):
+            yield chunk
+
+
+@router.post("/package")
+async def generate_package(request: GenerateRequest) -> Response:
+    """Generate a complete deployment package as a ZIP file."""
+    try:
+        # Validate tariffs and generate package (cached per input)
+        files = _get_deployment_package(request)
 
         # Create safe filename
-        safe_name = (
-            request.company_name.lower()
-            .replace(" ", "-")
-            .replace("å", "a")
-            .replace("ä", "a")
-            .replace("ö", "o")
-        )
+        safe_name = make_safe_name(request.company_name)
 
-        return Response(
-            content=zip_buffer.getvalue(),
+        return StreamingResponse(
+            _zip_chunks(files),
             media_type="application/zip",
             headers={
                 "Content-Disposition": f'attachment; filename="{safe_name}-tariff-api.zip"'
             },
         )
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tariff data: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate: {str(e)}")
 
@@ -73,19 +118,12 @@ async def generate_package(request: GenerateRequest) -> Response:
 async def preview_package(request: GenerateRequest) -> dict[str, Any]:
     """Preview the generated files without downloading."""
     try:
-        # Parse tariffs from JSON
-        tariffs_data = json.loads(request.tariffs_json)
-        tariffs = TariffsResponse.model_validate(tariffs_data)
-
-        # Generate package
-        generator = APIGenerator()
-        files = generator.generate_deployment_package(
-            tariffs, request.company_name, request.company_org_no
-        )
+        # Validate tariffs and generate package (cached per input)
+        files = _get_deployment_package(request)
 
         return {"files": files}
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tariff data: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to preview: {str(e)}")
 
@@ -94,15 +132,12 @@ async def preview_package(request: GenerateRequest) -> dict[str, Any]:
 async def generate_openapi(request: GenerateRequest) -> dict[str, Any]:
     """Generate only the OpenAPI specification."""
     try:
-        tariffs_data = json.loads(request.tariffs_json)
-        tariffs = TariffsResponse.model_validate(tariffs_data)
-
-        generator = APIGenerator()
-        return generator.generate_openapi_spec(
+        tariffs = TariffsResponse.model_validate_json(request.tariffs_json)
+        return _generator.generate_openapi_spec(
             tariffs, request.company_name, request.company_org_no
         )
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tariff data: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate: {str(e)}")
 
@@ -111,20 +146,13 @@ async def generate_openapi(request: GenerateRequest) -> dict[str, Any]:
 async def generate_json(request: GenerateRequest) -> Response:
     """Download the tariff data as a JSON file (RISE API format)."""
     try:
-        tariffs_data = json.loads(request.tariffs_json)
-        tariffs = TariffsResponse.model_validate(tariffs_data)
+        tariffs = TariffsResponse.model_validate_json(request.tariffs_json)
 
-        # Export as formatted JSON
+        # Export as formatted JSON in one pass through pydantic-core's serializer
         json_content = tariffs.model_dump_json(by_alias=True, indent=2)
 
         # Create safe filename
-        safe_name = (
-            request.company_name.lower()
-            .replace(" ", "-")
-            .replace("å", "a")
-            .replace("ä", "a")
-            .replace("ö", "o")
-        )
+        safe_name = make_safe_name(request.company_name)
 
         return Response(
             content=json_content,
@@ -133,173 +161,188 @@ async def generate_json(request: GenerateRequest) -> Response:
                 "Content-Disposition": f'attachment; filename="{safe_name}-tariffer.json"'
             },
         )
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tariff data: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate JSON: {str(e)}")
 
 
+# Human-readable Swedish labels for ISO 8601 priced periods
+_PERIOD_LABELS = {"P1M": "per månad", "P1Y": "per år", "P1D": "per dag"}
+# Calendar pattern references shown in the Excel time rule column, in priority order
+_DAY_LABELS = (("weekdays", "vardagar"), ("weekends", "helger"))
+
+
+def _format_period(period: str | None) -> str:
+    """Format an ISO 8601 priced period for display."""
+    return _PERIOD_LABELS.get(period, period or "")
+
+
+def _format_time_rule(comp: PriceComponent) -> str:
+    """Format time rules from recurringPeriods."""
+    if not comp.recurring_periods:
+        return ""
+    parts = []
+    for rp in comp.recurring_periods:
+        for ap in rp.active_periods or []:
+            time_str = ""
+            if ap.from_including and ap.to_excluding:
+                from_t = str(ap.from_including)[:5]
+                to_t = str(ap.to_excluding)[:5]
+                if from_t != "00:00" or to_t != "00:00":
+                    time_str = f"{from_t}-{to_t}"
+
+            day_str = ""
+            if ap.calendar_pattern_references:
+                includes = ap.calendar_pattern_references.include or []
+                for reference, label in _DAY_LABELS:
+                    if reference in includes:
+                        day_str = label
+                        break
+
+            if time_str or day_str:
+                parts.append(f"{time_str} {day_str}".strip())
+    return " | ".join(parts)
+
+
+def _iter_tariff_rows(tariffs: TariffsResponse) -> Iterator[tuple[Any, ...]]:
+    """Yield one Excel row per price component, in tariff order."""
+    fp = float
+    for tariff in tariffs.tariffs:
+        tariff_name = tariff.name
+        fixed_price = tariff.fixed_price
+        energy_price = tariff.energy_price
+        power_price = tariff.power_price
+
+        # Fixed prices
+        if fixed_price:
+            for comp in fixed_price.components:
+                price = comp.price
+                yield (
+                    tariff_name,
+                    "Fast avgift",
+                    comp.name,
+                    fp(price.price_ex_vat) if price else 0,
+                    fp(price.price_inc_vat) if price else 0,
+                    "kr",
+                    _format_period(comp.priced_period),
+                    _format_time_rule(comp),
+                    comp.description or "",
+                )
+
+        # Energy prices
+        if energy_price:
+            for comp in energy_price.components:
+                price = comp.price
+                yield (
+                    tariff_name,
+                    "Energiavgift",
+                    comp.name,
+                    fp(price.price_ex_vat) if price else 0,
+                    fp(price.price_inc_vat) if price else 0,
+                    f"kr/{comp.unit.value}" if comp.unit else "kr/kWh",
+                    "",
+                    _format_time_rule(comp),
+                    comp.description or "",
+                )
+
+        # Power prices
+        if power_price:
+            for comp in power_price.components:
+                # Add peak info to description
+                desc = comp.description or ""
+                if comp.peak_identification_settings:
+                    ps = comp.peak_identification_settings
+                    if ps.number_of_peaks_for_average_calculation and ps.number_of_peaks_for_average_calculation > 1:
+                        peak_info = f"Snitt av {ps.number_of_peaks_for_average_calculation} toppar"
+                        desc = f"{peak_info}. {desc}" if desc else peak_info
+
+                price = comp.price
+                yield (
+                    tariff_name,
+                    "Effektavgift",
+                    comp.name,
+                    fp(price.price_ex_vat) if price else 0,
+                    fp(price.price_inc_vat) if price else 0,
+                    f"kr/{comp.unit.value}" if comp.unit else "kr/kW",
+                    _format_period(comp.priced_period) if comp.priced_period else "per månad",
+                    _format_time_rule(comp),
+                    desc,
+                )
+
+
+def _build_excel(tariffs: TariffsResponse) -> bytes:
+    """Build the Excel workbook for the tariffs and return the file content."""
+    # Create write-only workbook with single flat sheet (rows are streamed, not kept as cells)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Tariffer")
+
+    # Header style is registered once per workbook and shared by all header cells
+    wb.add_named_style(
+        NamedStyle(
+            name=HEADER_STYLE_NAME,
+            font=_HEADER_FONT,
+            fill=_HEADER_FILL,
+            border=_HEADER_BORDER,
+        )
+    )
+
+    # Headers
+    headers = [
+        "Tariff", "Avgiftstyp", "Avgiftsnamn", "Pris ex moms", "Pris ink moms",
+        "Enhet", "Period", "Tidsregel", "Beskrivning"
+    ]
+    rows: list[tuple[Any, ...]] = []
+    # Column widths are tracked while rows are collected; there is no second pass over cells
+    widths = [len(header) for header in headers]
+    for row in _iter_tariff_rows(tariffs):
+        rows.append(row)
+        for i, value in enumerate(row):
+            length = len(value) if isinstance(value, str) else len(str(value))
+            if length > widths[i]:
+                widths[i] = length
+
+    # Column widths and frozen header must be set before the first row is written
+    for i, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = min(width + 2, 50)
+    ws.freeze_panes = "A2"
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.style = HEADER_STYLE_NAME
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in rows:
+        ws.append(row)
+
+    # Save to buffer
+    excel_buffer = io.BytesIO()
+    wb.save(excel_buffer)
+    return excel_buffer.getvalue()
+
+
 @router.post("/excel")
 async def generate_excel(request: GenerateRequest) -> Response:
     """Generate an Excel file with tariff data for easy sharing."""
     try:
-        tariffs_data = json.loads(request.tariffs_json)
-        tariffs = TariffsResponse.model_validate(tariffs_data)
-
-        # Create workbook with single flat sheet
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Tariffer"
-
-        # Styles
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="017E7A", end_color="017E7A", fill_type="solid")
-        section_fill = PatternFill(start_color="E8F5F4", end_color="E8F5F4", fill_type="solid")
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
+        tariffs = TariffsResponse.model_validate_json(request.tariffs_json)
 
-        # Headers
-        headers = [
-            "Tariff", "Avgiftstyp", "Avgiftsnamn", "Pris ex moms", "Pris ink moms",
-            "Enhet", "Period", "Tidsregel", "Beskrivning"
-        ]
-        ws.append(headers)
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.border = border
-
-        def format_time_rule(comp) -> str:
-            """Format time rules from recurringPeriods."""
-            if not comp.recurring_periods:
-                return ""
-            parts = []
-            for rp in comp.recurring_periods:
-                for ap in rp.active_periods or []:
-                    time_str = ""
-                    if ap.from_including and ap.to_excluding:
-                        from_t = str(ap.from_including)[:5]
-                        to_t = str(ap.to_excluding)[:5]
-                        if from_t != "00:00" or to_t != "00:00":
-                            time_str = f"{from_t}-{to_t}"
-
-                    day_str = ""
-                    if ap.calendar_pattern_references:
-                        includes = ap.calendar_pattern_references.include or []
-                        if "weekdays" in includes:
-                            day_str = "vardagar"
-                        elif "weekends" in includes:
-                            day_str = "helger"
-
-                    if time_str or day_str:
-                        parts.append(f"{time_str} {day_str}".strip())
-            return " | ".join(parts) if parts else ""
-
-        def format_period(period: str | None) -> str:
-            if period == "P1M":
-                return "per månad"
-            elif period == "P1Y":
-                return "per år"
-            elif period == "P1D":
-                return "per dag"
-            return period or ""
-
-        # Add rows for each tariff
-        for tariff in tariffs.tariffs:
-            # Fixed prices
-            if tariff.fixed_price and tariff.fixed_price.components:
-                for comp in tariff.fixed_price.components:
-                    ws.append([
-                        tariff.name,
-                        "Fast avgift",
-                        comp.name,
-                        float(comp.price.price_ex_vat) if comp.price else 0,
-                        float(comp.price.price_inc_vat) if comp.price else 0,
-                        "kr",
-                        format_period(comp.priced_period),
-                        format_time_rule(comp),
-                        comp.description or ""
-                    ])
-
-            # Energy prices
-            if tariff.energy_price and tariff.energy_price.components:
-                for comp in tariff.energy_price.components:
-                    ws.append([
-                        tariff.name,
-                        "Energiavgift",
-                        comp.name,
-                        float(comp.price.price_ex_vat) if comp.price else 0,
-                        float(comp.price.price_inc_vat) if comp.price else 0,
-                        f"kr/{comp.unit.value}" if comp.unit else "kr/kWh",
-                        "",
-                        format_time_rule(comp),
-                        comp.description or ""
-                    ])
-
-            # Power prices
-            if tariff.power_price and tariff.power_price.components:
-                for comp in tariff.power_price.components:
-                    # Add peak info to description
-                    desc = comp.description or ""
-                    if comp.peak_identification_settings:
-                        ps = comp.peak_identification_settings
-                        if ps.number_of_peaks_for_average_calculation and ps.number_of_peaks_for_average_calculation > 1:
-                            peak_info = f"Snitt av {ps.number_of_peaks_for_average_calculation} toppar"
-                            desc = f"{peak_info}. {desc}" if desc else peak_info
-
-                    ws.append([
-                        tariff.name,
-                        "Effektavgift",
-                        comp.name,
-                        float(comp.price.price_ex_vat) if comp.price else 0,
-                        float(comp.price.price_inc_vat) if comp.price else 0,
-                        f"kr/{comp.unit.value}" if comp.unit else "kr/kW",
-                        format_period(comp.priced_period) if comp.priced_period else "per månad",
-                        format_time_rule(comp),
-                        desc
-                    ])
-
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
-
-        # Freeze header row
-        ws.freeze_panes = "A2"
-
-        # Save to buffer
-        excel_buffer = io.BytesIO()
-        wb.save(excel_buffer)
-        excel_buffer.seek(0)
+        # openpyxl is synchronous; build the workbook in a worker thread
+        excel_content = await asyncio.to_thread(_build_excel, tariffs)
 
         # Create safe filename
-        safe_name = (
-            request.company_name.lower()
-            .replace(" ", "-")
-            .replace("å", "a")
-            .replace("ä", "a")
-            .replace("ö", "o")
-        )
+        safe_name = make_safe_name(request.company_name)
 
         return Response(
-            content=excel_buffer.getvalue(),
+            content=excel_content,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             headers={
                 "Content-Disposition": f'attachment; filename="{safe_name}-tariffer.xlsx"'
             },
         )
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tariff data: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate Excel: {str(e)}")
@@ -1,19 +1,19 @@
 """API endpoints for parsing tariff documents."""
 
-import json
-import os
+import asyncio
+from typing import Any
 
+import orjson
 from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
 
 from ..models.rise_schema import TariffsResponse
-from ..services.ai_parser import TariffParser
+from ..rate_limit import limiter
+from ..services.ai_parser import OPENROUTER_API_KEY, get_parser
 from ..services.pdf_parser import PDFParser
 from ..services.tariff_guard import check_el_tariff_text, check_tariffs_response
-from ..services.url_scraper import URLScraper
+from ..services.url_scraper import get_scraper
 
 
 class ImproveRequest(BaseModel):
@@ -31,13 +31,76 @@ class StreamRequest(BaseModel):
 
 router = APIRouter(prefix="/api/parse", tags=["parse"])
 
-# Rate limiter - 3 requests per hour per IP (to prevent API abuse)
-limiter = Limiter(key_func=get_remote_address)
+# PDFParser is stateless, so one instance serves all requests
+_pdf_parser = PDFParser()
+
+
+def _sse(event: dict[str, Any]) -> bytes:
+    """Encode an event as a Server-Sent Events data frame."""
+    return b"data: " + orjson.dumps(event) + b"\n\n"
+
+
+# Static SSE frames, serialized once
+_SSE_FETCHING_URL = _sse({"type": "status", "message": "Hämtar URL..."})
+_SSE_NO_CONTENT = _sse({"type": "error", "message": "Inget innehåll att analysera"})
+_SSE_MISSING_API_KEY = _sse({"type": "error", "message": "API-nyckel saknas"})
+_SSE_AI_START = _sse({"type": "status", "message": "Startar AI-analys med Sonnet 4.5..."})
+
 
 # Security limits
 MAX_TEXT_LENGTH = 100_000  # 100KB text limit
 MAX_PDF_SIZE = 10 * 1024 * 1024  # 10MB PDF limit
 MAX_URL_LENGTH = 2048  # Standard URL length limit
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Uploads are read in chunks so oversized files fail early
+
+# Rejection messages for the limits above, formatted once
+TEXT_TOO_LONG_DETAIL = f"Text too long. Maximum {MAX_TEXT_LENGTH} characters allowed."
+PDF_TOO_LARGE_DETAIL = f"PDF too large. Maximum {MAX_PDF_SIZE // (1024*1024)}MB allowed."
+URL_TOO_LONG_DETAIL = f"URL too long. Maximum {MAX_URL_LENGTH} characters allowed."
+
+# Largest accepted request body per route, checked against Content-Length before the
+# body is parsed. A percent-encoded form character takes up to 12 bytes (4 UTF-8 bytes,
+# each written as %XX).
+MAX_FORM_OVERHEAD = 64 * 1024
+MAX_ENCODED_CHAR_BYTES = 12
+MAX_BODY_SIZES = {
+    "/api/parse/text": MAX_ENCODED_CHAR_BYTES * MAX_TEXT_LENGTH + MAX_FORM_OVERHEAD,
+    "/api/parse/url": MAX_ENCODED_CHAR_BYTES * MAX_URL_LENGTH + MAX_FORM_OVERHEAD,
+    "/api/parse/pdf": MAX_PDF_SIZE + MAX_FORM_OVERHEAD,
+    "/api/parse/combined": (
+        MAX_PDF_SIZE
+        + MAX_ENCODED_CHAR_BYTES * (MAX_TEXT_LENGTH + MAX_URL_LENGTH)
+        + MAX_FORM_OVERHEAD
+    ),
+}
+
+
+def _tariffs_response(result: TariffsResponse) -> Response:
+    """Serialize an already validated result directly.
+
+    Returning a Response skips FastAPI's response_model validation, which would
+    otherwise validate the whole tariff tree a second time. The route's
+    response_model is kept for documentation.
+    """
+    return Response(
+        content=result.model_dump_json(by_alias=True),
+        media_type="application/json",
+    )
+
+
+def _is_pdf_filename(filename: str | None) -> bool:
+    """Check for a .pdf extension, lowercasing only the last four characters."""
+    return bool(filename) and filename[-4:].lower() == ".pdf"
+
+
+async def _read_pdf_upload(file: UploadFile) -> bytes:
+    """Read an uploaded PDF, aborting as soon as it exceeds MAX_PDF_SIZE."""
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        buffer.extend(chunk)
+        if len(buffer) > MAX_PDF_SIZE:
+            raise HTTPException(status_code=400, detail=PDF_TOO_LARGE_DETAIL)
+    return bytes(buffer)
 
 
 @router.post("/text", response_model=TariffsResponse)
@@ -50,10 +113,7 @@ async def parse_text(
     """Parse tariff information from text. Rate limited to 3 requests/hour."""
     # Input validation
     if len(content) > MAX_TEXT_LENGTH:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Text too long. Maximum {MAX_TEXT_LENGTH} characters allowed."
-        )
+        raise HTTPException(status_code=400, detail=TEXT_TOO_LONG_DETAIL)
 
     if not content.strip():
         raise HTTPException(status_code=400, detail="Content cannot be empty")
@@ -63,16 +123,15 @@ async def parse_text(
         raise HTTPException(status_code=400, detail=guard.reason)
 
     try:
-        api_key = os.environ.get("OPENROUTER_API_KEY")
-        if not api_key:
+        if not OPENROUTER_API_KEY:
             raise HTTPException(status_code=500, detail="API key not configured")
 
-        parser = TariffParser(api_key)
+        parser = get_parser(OPENROUTER_API_KEY)
         result = await parser.parse_text(content, company_name)
         guard_result = check_tariffs_response(result)
         if not guard_result.ok:
             raise HTTPException(status_code=400, detail=guard_result.reason)
-        return result
+        return _tariffs_response(result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -87,21 +146,14 @@ async def parse_pdf(
     company_name: str | None = Form(None, description="Company name"),
 ):
     """Parse tariff information from a PDF file. Rate limited to 3 requests/hour."""
-    if not file.filename or not file.filename.lower().endswith(".pdf"):
+    if not _is_pdf_filename(file.filename):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
     try:
         # Extract text from PDF
-        pdf_parser = PDFParser()
-        pdf_content = await file.read()
-
-        # Check file size
-        if len(pdf_content) > MAX_PDF_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"PDF too large. Maximum {MAX_PDF_SIZE // (1024*1024)}MB allowed."
-            )
-        text = pdf_parser.extract_text_from_bytes(pdf_content)
+        pdf_content = await _read_pdf_upload(file)
+        # PDF extraction is CPU-bound; run it in a worker thread
+        text = await asyncio.to_thread(_pdf_parser.extract_text_from_bytes, pdf_content)
 
         if not text.strip():
             raise HTTPException(
@@ -113,16 +165,15 @@ async def parse_pdf(
             raise HTTPException(status_code=400, detail=guard.reason)
 
         # Parse with AI
-        api_key = os.environ.get("OPENROUTER_API_KEY")
-        if not api_key:
+        if not OPENROUTER_API_KEY:
             raise HTTPException(status_code=500, detail="API key not configured")
 
-        parser = TariffParser(api_key)
+        parser = get_parser(OPENROUTER_API_KEY)
         result = await parser.parse_pdf_content(text, company_name)
         guard_result = check_tariffs_response(result)
         if not guard_result.ok:
             raise HTTPException(status_code=400, detail=guard_result.reason)
-        return result
+        return _tariffs_response(result)
     except HTTPException:
         raise
     except ValueError as e:
@@ -141,14 +192,11 @@ async def parse_url(
     """Parse tariff information from a URL (supports both web pages and PDFs). Rate limited to 3 requests/hour."""
     # URL validation
     if len(url) > MAX_URL_LENGTH:
-        raise HTTPException(
-            status_code=400,
-            detail=f"URL too long. Maximum {MAX_URL_LENGTH} characters allowed."
-        )
+        raise HTTPException(status_code=400, detail=URL_TOO_LONG_DETAIL)
 
     try:
         # Scrape URL (includes SSRF protection)
-        scraper = URLScraper()
+        scraper = get_scraper()
         text = await scraper.scrape_url(url)
 
         if not text.strip():
@@ -161,16 +209,15 @@ async def parse_url(
             raise HTTPException(status_code=400, detail=guard.reason)
 
         # Parse with AI
-        api_key = os.environ.get("OPENROUTER_API_KEY")
-        if not api_key:
+        if not OPENROUTER_API_KEY:
             raise HTTPException(status_code=500, detail="API key not configured")
 
-        parser = TariffParser(api_key)
+        parser = get_parser(OPENROUTER_API_KEY)
         result = await parser.parse_text(text, company_name)
         guard_result = check_tariffs_response(result)
         if not guard_result.ok:
             raise HTTPException(status_code=400, detail=guard_result.reason)
-        return result
+        return _tariffs_response(result)
     except HTTPException:
         raise
     except ValueError as e:
@@ -192,51 +239,53 @@ async def parse_combined(
     Combines all provided inputs for best AI analysis.
     Rate limited to 3 requests/hour.
     """
-    combined_content = []
+    has_url = bool(url and url.strip())
+    has_pdf = bool(file and file.filename)
+    has_text = bool(text and text.strip())
+
+    # Validate all inputs before any fetching or extraction starts
+    if has_url and len(url) > MAX_URL_LENGTH:
+        raise HTTPException(status_code=400, detail=URL_TOO_LONG_DETAIL)
+    if has_pdf and not _is_pdf_filename(file.filename):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    if has_text and len(text) > MAX_TEXT_LENGTH:
+        raise HTTPException(status_code=400, detail=TEXT_TOO_LONG_DETAIL)
 
-    # Process URL if provided
-    if url and url.strip():
-        if len(url) > MAX_URL_LENGTH:
-            raise HTTPException(
-                status_code=400,
-                detail=f"URL too long. Maximum {MAX_URL_LENGTH} characters allowed."
-            )
+    # Read the upload up front so its size check fails before the URL is fetched
+    pdf_content = await _read_pdf_upload(file) if has_pdf else b""
+
+    async def url_section() -> str | None:
         try:
-            scraper = URLScraper()
-            url_text = await scraper.scrape_url(url)
-            if url_text.strip():
-                combined_content.append(f"=== INNEHÅLL FRÅN URL ({url}) ===\n{url_text}")
+            url_text = await get_scraper().scrape_url(url)
         except Exception as e:
             # Continue with other sources if URL fails
-            combined_content.append(f"=== URL FEL: {str(e)} ===")
+            return f"=== URL FEL: {str(e)} ==="
+        if url_text.strip():
+            return f"=== INNEHÅLL FRÅN URL ({url}) ===\n{url_text}"
+        return None
 
-    # Process PDF if provided
-    if file and file.filename:
-        if not file.filename.lower().endswith(".pdf"):
-            raise HTTPException(status_code=400, detail="File must be a PDF")
+    async def pdf_section() -> str | None:
         try:
-            pdf_parser = PDFParser()
-            pdf_content = await file.read()
-            if len(pdf_content) > MAX_PDF_SIZE:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"PDF too large. Maximum {MAX_PDF_SIZE // (1024*1024)}MB allowed."
-                )
-            pdf_text = pdf_parser.extract_text_from_bytes(pdf_content)
-            if pdf_text.strip():
-                combined_content.append(f"=== INNEHÅLL FRÅN PDF ({file.filename}) ===\n{pdf_text}")
-        except HTTPException:
-            raise
-        except Exception as e:
-            combined_content.append(f"=== PDF FEL: {str(e)} ===")
-
-    # Process text if provided
-    if text and text.strip():
-        if len(text) > MAX_TEXT_LENGTH:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Text too long. Maximum {MAX_TEXT_LENGTH} characters allowed."
+            pdf_text = await asyncio.to_thread(
+                _pdf_parser.extract_text_from_bytes, pdf_content
             )
+        except Exception as e:
+            return f"=== PDF FEL: {str(e)} ==="
+        if pdf_text.strip():
+            return f"=== INNEHÅLL FRÅN PDF ({file.filename}) ===\n{pdf_text}"
+        return None
+
+    # URL fetch and PDF extraction are independent, so run them concurrently
+    sections = []
+    if has_url:
+        sections.append(url_section())
+    if has_pdf:
+        sections.append(pdf_section())
+    combined_content = [
+        section for section in await asyncio.gather(*sections) if section
+    ]
+
+    if has_text:
         combined_content.append(f"=== FRITEXT ===\n{text}")
 
     if not combined_content:
@@ -254,17 +303,16 @@ async def parse_combined(
 
     # Parse with AI
     try:
-        api_key = os.environ.get("OPENROUTER_API_KEY")
-        if not api_key:
+        if not OPENROUTER_API_KEY:
             raise HTTPException(status_code=500, detail="API key not configured")
 
-        parser = TariffParser(api_key)
+        parser = get_parser(OPENROUTER_API_KEY)
         # Note: company_name is now extracted by AI from content
         result = await parser.parse_text(full_content, None)
         guard_result = check_tariffs_response(result)
         if not guard_result.ok:
             raise HTTPException(status_code=400, detail=guard_result.reason)
-        return result
+        return _tariffs_response(result)
     except HTTPException:
         raise
     except ValueError as e:
@@ -285,36 +333,29 @@ async def improve_tariffs(
     and returns updated tariff data.
     Rate limited to 3 requests/hour.
     """
-    try:
-        # Validate JSON
-        tariffs_data = json.loads(body.tariffs_json)
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
-
     if not body.instruction.strip():
         raise HTTPException(status_code=400, detail="Instruction cannot be empty")
 
     try:
-        tariffs_response = TariffsResponse.model_validate(tariffs_data)
-        guard_result = check_tariffs_response(tariffs_response)
-        if not guard_result.ok:
-            raise HTTPException(status_code=400, detail=guard_result.reason)
-    except HTTPException:
-        raise
-    except Exception as e:
+        # Parse and validate JSON in one pass
+        tariffs_response = TariffsResponse.model_validate_json(body.tariffs_json)
+    except ValidationError as e:
         raise HTTPException(status_code=400, detail=f"Invalid tariff data: {str(e)}")
 
+    guard_result = check_tariffs_response(tariffs_response)
+    if not guard_result.ok:
+        raise HTTPException(status_code=400, detail=guard_result.reason)
+
     try:
-        api_key = os.environ.get("OPENROUTER_API_KEY")
-        if not api_key:
+        if not OPENROUTER_API_KEY:
             raise HTTPException(status_code=500, detail="API key not configured")
 
-        parser = TariffParser(api_key)
-        result = await parser.improve_tariffs(tariffs_data, body.instruction)
+        parser = get_parser(OPENROUTER_API_KEY)
+        result = await parser.improve_tariffs(body.tariffs_json, body.instruction)
         guard_result = check_tariffs_response(result)
         if not guard_result.ok:
             raise HTTPException(status_code=400, detail=guard_result.reason)
-        return result
+        return _tariffs_response(result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -341,13 +382,13 @@ async def stream_analysis(
 
             # Fetch URL content if provided
             if body.url:
-                yield f"data: {json.dumps({'type': 'status', 'message': 'Hämtar URL...'})}\n\n"
+                yield _SSE_FETCHING_URL
                 try:
-                    scraper = URLScraper()
+                    scraper = get_scraper()
                     content_to_parse = await scraper.scrape_url(body.url)
-                    yield f"data: {json.dumps({'type': 'status', 'message': f'Hämtade {len(content_to_parse)} tecken'})}\n\n"
+                    yield _sse({'type': 'status', 'message': f'Hämtade {len(content_to_parse)} tecken'})
                 except Exception as e:
-                    yield f"data: {json.dumps({'type': 'error', 'message': f'Kunde inte hämta URL: {str(e)}'})}\n\n"
+                    yield _sse({'type': 'error', 'message': f'Kunde inte hämta URL: {str(e)}'})
                     return
 
             # Use text if provided (in addition to or instead of URL)
@@ -358,30 +399,29 @@ async def stream_analysis(
                     content_to_parse = body.text
 
             if not content_to_parse.strip():
-                yield f"data: {json.dumps({'type': 'error', 'message': 'Inget innehåll att analysera'})}\n\n"
+                yield _SSE_NO_CONTENT
                 return
 
             guard = check_el_tariff_text(content_to_parse)
             if not guard.ok:
-                yield f"data: {json.dumps({'type': 'error', 'message': guard.reason})}\n\n"
+                yield _sse({'type': 'error', 'message': guard.reason})
                 return
 
             # Initialize parser
-            api_key = os.environ.get("OPENROUTER_API_KEY")
-            if not api_key:
-                yield f"data: {json.dumps({'type': 'error', 'message': 'API-nyckel saknas'})}\n\n"
+            if not OPENROUTER_API_KEY:
+                yield _SSE_MISSING_API_KEY
                 return
 
-            yield f"data: {json.dumps({'type': 'status', 'message': 'Startar AI-analys med Sonnet 4.5...'})}\n\n"
+            yield _SSE_AI_START
 
-            parser = TariffParser(api_key)
+            parser = get_parser(OPENROUTER_API_KEY)
 
             # Stream the analysis
-            for chunk in parser.parse_text_streaming(content_to_parse, body.company_name):
-                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            async for chunk in parser.parse_text_streaming(content_to_parse, body.company_name):
+                yield _sse(chunk)
 
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            yield _sse({'type': 'error', 'message': str(e)})
 
     return StreamingResponse(
         generate_events(),
@@ -3,11 +3,12 @@
 import os
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from ..models.rise_schema import TariffsResponse
+from ..rate_limit import limiter
 from ..services.tariff_guard import check_tariffs_response
 from ..services.storage import get_storage
 
@@ -26,9 +27,6 @@ class SaveResultResponse(BaseModel):
 
 router = APIRouter(prefix="/api/results", tags=["results"])
 
-# Rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
 
 @router.post("/save", response_model=SaveResultResponse)
 @limiter.limit("30/hour")
@@ -55,12 +53,15 @@ async def save_result(
     user_agent = request.headers.get("user-agent", "")[:200]  # Truncate
     ip_address = get_remote_address(request)
 
-    result_id = storage.save(
-        body.tariffs_json,
-        body.source_url,
-        user_agent=user_agent,
-        ip_address=ip_address,
-    )
+    try:
+        result_id = storage.save(
+            body.tariffs_json,
+            body.source_url,
+            user_agent=user_agent,
+            ip_address=ip_address,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tariff data: {str(e)}")
 
     # Build the share URL
     host = request.headers.get("host", "eltariff.sourceful.dev")
@@ -87,12 +88,13 @@ async def get_result(result_id: str):
     if result is None:
         raise HTTPException(status_code=404, detail="Result not found")
 
-    return {
+    # Stored data is plain JSON, so it can be encoded directly without jsonable_encoder
+    return ORJSONResponse({
         "id": result.get("id"),
         "created_at": result.get("created_at"),
         "source_url": result.get("source_url"),
         "tariffs": result.get("data"),
-    }
+    })
 
 
 @router.get("/cleanup", include_in_schema=False)
@@ -5,8 +5,10 @@ https://sourceful.energy
 """
 
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+import orjson
 from dotenv import load_dotenv
 
 # Load .env file
@@ -14,17 +16,26 @@ load_dotenv()
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-from slowapi.util import get_remote_address
 
 from .api import explore, generate, parse, results
+from .middleware import ContentLengthLimitMiddleware, HealthCheckMiddleware
+from .rate_limit import limiter
+from .services.ai_parser import OPENROUTER_API_KEY, close_parser
+from .services.url_scraper import close_scraper
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release shared HTTP clients on shutdown."""
+    yield
+    await close_scraper()
+    await close_parser()
 
-# Rate limiter - 3 requests per hour for AI endpoints
-limiter = Limiter(key_func=get_remote_address)
 
 # Create FastAPI app
 app = FastAPI(
@@ -34,21 +45,35 @@ app = FastAPI(
     docs_url=None,
     redoc_url=None,
     openapi_url=None,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
-# Add rate limiter
+# Add rate limiter (shared with the routers)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Reject oversized parse requests before their body is read (added first so CORS wraps it)
+app.add_middleware(ContentLengthLimitMiddleware, limits=parse.MAX_BODY_SIZES)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
-    allow_methods=["*"],
+    allow_methods=["GET", "POST"],  # The API only exposes GET and POST routes
     allow_headers=["*"],
+    max_age=86400,  # Let browsers cache preflight responses (capped by the browser)
 )
 
+# Health check: added last so it runs outermost. The payload cannot change at runtime
+# (the key is read at import), so it is encoded once.
+HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "api_key_configured": bool(OPENROUTER_API_KEY),
+})
+app.add_middleware(HealthCheckMiddleware, path="/health", body=HEALTH_BODY)
+
 # Include API routers
 app.include_router(parse.router)
 app.include_router(generate.router)
@@ -65,16 +90,21 @@ if static_dir.exists():
     app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 
+# Pages without per-request data are rendered once at startup
+INDEX_HTML = templates.get_template("index.html").render()
+EXPLORER_HTML = templates.get_template("explorer.html").render()
+
+
 @app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
+async def home():
     """Serve the main page."""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return HTMLResponse(INDEX_HTML)
 
 
 @app.get("/explorer", response_class=HTMLResponse)
-async def explorer(request: Request):
+async def explorer():
     """Serve the API explorer page."""
-    return templates.TemplateResponse("explorer.html", {"request": request})
+    return HTMLResponse(EXPLORER_HTML)
 
 
 @app.get("/r/{result_id}", response_class=HTMLResponse)
@@ -88,14 +118,22 @@ async def shared_result(request: Request, result_id: str):
 
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "api_key_configured": bool(os.environ.get("ANTHROPIC_API_KEY")),
-    }
+    """Health check endpoint.
+
+    GET and HEAD are answered by HealthCheckMiddleware before reaching this route; it
+    stays registered so other methods get 405 as before.
+    """
+    return Response(HEALTH_BODY, media_type="application/json")
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvicorn picks uvloop and httptools automatically when installed (uvicorn[standard]).
+    # Multiple workers need an app import string; set RATELIMIT_STORAGE_URI to share limits.
+    uvicorn.run(
+        "eltariff.main:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", "8000")),
+        workers=int(os.environ.get("WEB_CONCURRENCY", "1")),
+    )
@@ -0,0 +1,66 @@
+"""ASGI middleware for the Eltariff API."""
+
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class ContentLengthLimitMiddleware:
+    """Reject requests whose declared Content-Length exceeds the limit for their path.
+
+    Runs before the body is read, so oversized form posts and uploads are refused
+    without being parsed. Requests without a Content-Length header (chunked) pass
+    through and are caught by the endpoints' own length checks.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]) -> None:
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            limit = self.limits.get(scope["path"])
+            if limit is not None:
+                for name, value in scope["headers"]:
+                    if name == b"content-length":
+                        if value.isdigit() and int(value) > limit:
+                            response = ORJSONResponse(
+                                {"detail": "Request body too large"}, status_code=413
+                            )
+                            await response(scope, receive, send)
+                            return
+                        break
+        await self.app(scope, receive, send)
+
+
+class HealthCheckMiddleware:
+    """Answer health checks with a precomputed body before any other middleware runs.
+
+    Load balancers poll this path constantly, so it skips CORS, routing and
+    response serialization entirely.
+    """
+
+    def __init__(self, app: ASGIApp, path: str, body: bytes) -> None:
+        self.app = app
+        self.path = path
+        self.start = {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+        self.body = {"type": "http.response.body", "body": body}
+        self.head_body = {"type": "http.response.body", "body": b""}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Other methods fall through so the app still answers them with 405
+        if (
+            scope["type"] == "http"
+            and scope["path"] == self.path
+            and scope["method"] in ("GET", "HEAD")
+        ):
+            await send(self.start)
+            await send(self.body if scope["method"] == "GET" else self.head_body)
+            return
+        await self.app(scope, receive, send)
@@ -22,22 +22,6 @@ class ParseRequest(BaseModel):
     model_config = {"populate_by_name": True}
 
 
-class CompanyInfo(BaseModel):
-    """Information about the grid company."""
-    name: str = Field(description="Företagsnamn")
-    org_no: str = Field(alias="orgNo", description="Organisationsnummer")
-
-    model_config = {"populate_by_name": True}
-
-
-class GenerateRequest(BaseModel):
-    """Request to generate API code."""
-    company_info: CompanyInfo = Field(alias="companyInfo")
-    tariffs_json: str = Field(alias="tariffsJson", description="JSON string of parsed tariffs")
-
-    model_config = {"populate_by_name": True}
-
-
 class ExploreRequest(BaseModel):
     """Request to explore an existing RISE API."""
     api_url: HttpUrl = Field(alias="apiUrl")
@@ -190,8 +190,9 @@ class InfoResponse(BaseModel):
     model_config = {"populate_by_name": True}
 
 
-# Default calendar patterns for Sweden
-DEFAULT_CALENDAR_PATTERNS = [
+# Default calendar patterns for Sweden. Built once and shared by every parsed response
+# (model instances are not re-validated), so the collection is a tuple that cannot be mutated.
+DEFAULT_CALENDAR_PATTERNS = (
     CalendarPattern(
         reference="weekdays",
         frequency="P1W",
@@ -219,4 +220,4 @@ DEFAULT_CALENDAR_PATTERNS = [
             date(2025, 12, 26), # Annandag jul
         ],
     ),
-]
+)
@@ -0,0 +1,18 @@
+"""Shared rate limiter for all API routers."""
+
+import os
+
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+# Counters live in process memory by default. Set RATELIMIT_STORAGE_URI
+# (e.g. redis://localhost:6379/0, needs the redis extra) to share them
+# between workers.
+RATELIMIT_STORAGE_URI = os.environ.get("RATELIMIT_STORAGE_URI", "memory://")
+
+# If the shared storage is unreachable, limits keep working per process instead of failing requests
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=RATELIMIT_STORAGE_URI,
+    in_memory_fallback_enabled=True,
+)
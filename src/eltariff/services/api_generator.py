@@ -7,6 +7,14 @@ from jinja2 import Environment, FileSystemLoader
 
 from ..models.rise_schema import TariffsResponse
 
+# Translation table for file/service-safe names (applied after lower())
+_SAFE_NAME_TABLE = str.maketrans({" ": "-", "å": "a", "ä": "a", "ö": "o"})
+
+
+def make_safe_name(name: str) -> str:
+    """Create a file- and service-safe name from a company name."""
+    return name.lower().translate(_SAFE_NAME_TABLE)
+
 
 class APIGenerator:
     """Generator for creating deployable RISE API code."""
@@ -234,13 +242,7 @@ class APIGenerator:
         """
         template = self.env.get_template("docker-compose.yml.j2")
         # Create a safe service name from company name
-        service_name = (
-            company_name.lower()
-            .replace(" ", "-")
-            .replace("å", "a")
-            .replace("ä", "a")
-            .replace("ö", "o")
-        )
+        service_name = make_safe_name(company_name)
         return template.render(
             company_name=company_name,
             service_name=service_name,
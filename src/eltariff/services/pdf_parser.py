@@ -7,8 +7,6 @@ import io
 import tempfile
 from pathlib import Path
 
-import pymupdf4llm
-
 
 class PDFParser:
     """Service for extracting text content from PDF files for LLM processing."""
@@ -22,6 +20,9 @@ class PDFParser:
         Returns:
             Extracted text content optimized for LLM processing
         """
+        # Imported on first use: pymupdf is slow to load and most requests never parse a PDF
+        import pymupdf4llm
+
         # pymupdf4llm needs a file path, so we write to a temp file
         with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
             tmp.write(pdf_file.read())
@@ -1,7 +1,6 @@
 """Simple file-based storage for shareable results."""
 
 import hashlib
-import json
 import os
 import secrets
 import string
@@ -9,6 +8,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
 
+import orjson
+
 
 class ResultStorage:
     """Stores and retrieves tariff results by unique ID."""
@@ -55,6 +56,9 @@ class ResultStorage:
 
         Returns:
             A unique ID that can be used to retrieve the data
+
+        Raises:
+            ValueError: If the data cannot be serialized (e.g. integers beyond 64 bits)
         """
         # Generate unique ID
         result_id = self._generate_id()
@@ -73,10 +77,15 @@ class ResultStorage:
             "data": data,
         }
 
+        # Serialize before touching the file so rejected data leaves nothing behind
+        try:
+            payload = orjson.dumps(result, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError as e:
+            raise ValueError(f"Data cannot be stored: {e}") from e
+
         # Save to file
         file_path = self.storage_dir / f"{result_id}.json"
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        file_path.write_bytes(payload)
 
         return result_id
 
@@ -99,9 +108,8 @@ class ResultStorage:
             return None
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
+            return orjson.loads(file_path.read_bytes())
+        except (orjson.JSONDecodeError, IOError):
             return None
 
     def delete(self, result_id: str) -> bool:
@@ -137,28 +145,27 @@ class ResultStorage:
             reverse=True
         )[:limit]:
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    # Return metadata only, not full tariff data
-                    # Extract browser from user agent for display
-                    user_agent = data.get("user_agent", "")
-                    browser = "Unknown"
-                    if "Chrome" in user_agent:
-                        browser = "Chrome"
-                    elif "Firefox" in user_agent:
-                        browser = "Firefox"
-                    elif "Safari" in user_agent:
-                        browser = "Safari"
-
-                    results.append({
-                        "id": data.get("id"),
-                        "created_at": data.get("created_at"),
-                        "source_url": data.get("source_url"),
-                        "tariff_count": len(data.get("data", {}).get("tariffs", [])),
-                        "ip_hash": data.get("ip_hash"),
-                        "browser": browser,
-                    })
-            except (json.JSONDecodeError, IOError):
+                data = orjson.loads(file_path.read_bytes())
+                # Return metadata only, not full tariff data
+                # Extract browser from user agent for display
+                user_agent = data.get("user_agent", "")
+                browser = "Unknown"
+                if "Chrome" in user_agent:
+                    browser = "Chrome"
+                elif "Firefox" in user_agent:
+                    browser = "Firefox"
+                elif "Safari" in user_agent:
+                    browser = "Safari"
+
+                results.append({
+                    "id": data.get("id"),
+                    "created_at": data.get("created_at"),
+                    "source_url": data.get("source_url"),
+                    "tariff_count": len(data.get("data", {}).get("tariffs", [])),
+                    "ip_hash": data.get("ip_hash"),
+                    "browser": browser,
+                })
+            except (orjson.JSONDecodeError, IOError):
                 continue
         return results
 
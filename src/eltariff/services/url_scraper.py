@@ -3,9 +3,13 @@
 Uses Crawl4AI for LLM-optimized content extraction (open source, free).
 """
 
+import asyncio
 import ipaddress
 import socket
-from urllib.parse import urlparse
+import time
+from collections import OrderedDict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from urllib.parse import parse_qsl, urlencode, urlparse
 
 import httpx
 from bs4 import BeautifulSoup
@@ -15,6 +19,10 @@ from .pdf_parser import PDFParser
 # Maximum PDF size to download (10MB)
 MAX_PDF_DOWNLOAD_SIZE = 10 * 1024 * 1024
 
+# Scraped text is reused for repeated requests to the same URL within the TTL
+SCRAPE_CACHE_TTL = 60 * 60  # seconds
+SCRAPE_CACHE_SIZE = 128
+
 # Allowed domains for RISE API fetching (whitelist for known safe APIs)
 ALLOWED_API_DOMAINS = [
     "api.goteborgenergi.cloud",
@@ -85,6 +93,22 @@ def is_safe_url(url: str) -> bool:
         raise ValueError(f"Invalid URL: {e}")
 
 
+def normalize_url(url: str) -> str:
+    """Normalize a URL for use as a cache key.
+
+    Lowercases scheme and host, sorts query parameters and drops the fragment.
+    The path is kept as-is since servers may treat it case- and slash-sensitively.
+    """
+    parsed = urlparse(url.strip())
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return parsed._replace(
+        scheme=parsed.scheme.lower(),
+        netloc=parsed.netloc.lower(),
+        query=query,
+        fragment="",
+    ).geturl()
+
+
 class URLScraper:
     """Service for scraping tariff information from web pages."""
 
@@ -98,6 +122,24 @@ class URLScraper:
         self.headers = {
             "User-Agent": "Eltariff-AI-API/1.0 (https://github.com/sourceful-energy/eltariff-ai-api)"
         }
+        self._client: httpx.AsyncClient | None = None
+        self.pdf_parser = PDFParser()
+        # (normalized URL, use_crawl4ai) -> (monotonic fetch time, text)
+        self._scrape_cache: OrderedDict[tuple[str, bool], tuple[float, str]] = OrderedDict()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            # The client is shared by all users, so it must never store cookies
+            no_cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+            self._client = httpx.AsyncClient(timeout=self.timeout, cookies=no_cookies)
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client and release its connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def scrape_url(self, url: str, use_crawl4ai: bool = True) -> str:
         """Scrape text content from a URL (supports both web pages and PDFs).
@@ -117,48 +159,66 @@ class URLScraper:
         # Validate URL to prevent SSRF
         is_safe_url(url)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            # First check if it's a PDF by doing a HEAD request
-            try:
-                head_response = await client.head(url, headers=self.headers, follow_redirects=True)
-                content_type = head_response.headers.get("content-type", "").lower()
-            except Exception:
-                content_type = ""
-
-            # Handle PDF files
-            if "application/pdf" in content_type or url.lower().endswith(".pdf"):
-                response = await client.get(url, headers=self.headers, follow_redirects=True)
-                response.raise_for_status()
-                pdf_content = response.content
-
-                # Check PDF size
-                if len(pdf_content) > MAX_PDF_DOWNLOAD_SIZE:
-                    raise ValueError(
-                        f"PDF too large. Maximum {MAX_PDF_DOWNLOAD_SIZE // (1024*1024)}MB allowed."
-                    )
-
-                # Extract text from PDF
-                pdf_parser = PDFParser()
-                text = pdf_parser.extract_text_from_bytes(pdf_content)
-
-                if not text.strip():
-                    raise ValueError("Could not extract text from PDF")
-
+        key = (normalize_url(url), use_crawl4ai)
+        cached = self._scrape_cache.get(key)
+        if cached is not None:
+            fetched_at, text = cached
+            if time.monotonic() - fetched_at < SCRAPE_CACHE_TTL:
+                self._scrape_cache.move_to_end(key)
                 return text
+            del self._scrape_cache[key]
+
+        text = await self._scrape(url, use_crawl4ai)
+
+        self._scrape_cache[key] = (time.monotonic(), text)
+        if len(self._scrape_cache) > SCRAPE_CACHE_SIZE:
+            self._scrape_cache.popitem(last=False)
+        return text
+
+    async def _scrape(self, url: str, use_crawl4ai: bool) -> str:
+        """Fetch and extract the content of an already validated URL."""
+        client = self._get_client()
 
-            # For HTML pages, use Crawl4AI for LLM-optimized extraction
-            if use_crawl4ai:
-                try:
-                    return await self._scrape_with_crawl4ai(url)
-                except Exception as e:
-                    # Fall back to basic scraping if Crawl4AI fails
-                    print(f"Crawl4AI failed, falling back to basic scraping: {e}")
-                    pass
+        # First check if it's a PDF by doing a HEAD request
+        try:
+            head_response = await client.head(url, headers=self.headers, follow_redirects=True)
+            content_type = head_response.headers.get("content-type", "").lower()
+        except Exception:
+            content_type = ""
 
-            # Basic HTML scraping fallback
+        # Handle PDF files
+        if "application/pdf" in content_type or url.lower().endswith(".pdf"):
             response = await client.get(url, headers=self.headers, follow_redirects=True)
             response.raise_for_status()
-            return self._extract_text(response.text)
+            pdf_content = response.content
+
+            # Check PDF size
+            if len(pdf_content) > MAX_PDF_DOWNLOAD_SIZE:
+                raise ValueError(
+                    f"PDF too large. Maximum {MAX_PDF_DOWNLOAD_SIZE // (1024*1024)}MB allowed."
+                )
+
+            # Extract text from PDF (CPU-bound, so keep it off the event loop)
+            text = await asyncio.to_thread(self.pdf_parser.extract_text_from_bytes, pdf_content)
+
+            if not text.strip():
+                raise ValueError("Could not extract text from PDF")
+
+            return text
+
+        # For HTML pages, use Crawl4AI for LLM-optimized extraction
+        if use_crawl4ai:
+            try:
+                return await self._scrape_with_crawl4ai(url)
+            except Exception as e:
+                # Fall back to basic scraping if Crawl4AI fails
+                print(f"Crawl4AI failed, falling back to basic scraping: {e}")
+                pass
+
+        # Basic HTML scraping fallback
+        response = await client.get(url, headers=self.headers, follow_redirects=True)
+        response.raise_for_status()
+        return self._extract_text(response.text)
 
     async def _scrape_with_crawl4ai(self, url: str) -> str:
         """Use Crawl4AI for LLM-optimized content extraction.
@@ -230,10 +290,10 @@ class URLScraper:
         """Fetch JSON data from a URL with SSRF protections."""
         is_safe_url(url)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url, headers=self.headers, follow_redirects=True)
-            response.raise_for_status()
-            return response.json()
+        client = self._get_client()
+        response = await client.get(url, headers=self.headers, follow_redirects=True)
+        response.raise_for_status()
+        return response.json()
 
     async def fetch_rise_api(self, api_url: str) -> dict:
         """Fetch data from a RISE-compatible API.
@@ -247,6 +307,29 @@ class URLScraper:
         Raises:
             ValueError: If URL is not safe to request
         """
+        response = await self._get_rise_tariffs(api_url)
+        return response.json()
+
+    async def fetch_rise_api_bytes(self, api_url: str) -> bytes:
+        """Fetch the raw tariffs JSON from a RISE-compatible API.
+
+        Useful when the body is validated directly with Pydantic's
+        model_validate_json, skipping the intermediate dict.
+
+        Args:
+            api_url: Base URL of the RISE API
+
+        Returns:
+            Raw API response body
+
+        Raises:
+            ValueError: If URL is not safe to request
+        """
+        response = await self._get_rise_tariffs(api_url)
+        return response.content
+
+    async def _get_rise_tariffs(self, api_url: str) -> httpx.Response:
+        """Request the /tariffs resource of a RISE-compatible API."""
         # Validate URL to prevent SSRF
         is_safe_url(api_url)
 
@@ -256,7 +339,25 @@ class URLScraper:
         # Try to fetch tariffs
         tariffs_url = f"{base_url}/tariffs"
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(tariffs_url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        client = self._get_client()
+        response = await client.get(tariffs_url, headers=self.headers)
+        response.raise_for_status()
+        return response
+
+
+# Singleton instance
+_scraper: URLScraper | None = None
+
+
+def get_scraper() -> URLScraper:
+    """Get the singleton scraper instance."""
+    global _scraper
+    if _scraper is None:
+        _scraper = URLScraper()
+    return _scraper
+
+
+async def close_scraper() -> None:
+    """Close the singleton scraper's HTTP client, if one was created."""
+    if _scraper is not None:
+        await _scraper.aclose()